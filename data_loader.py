@@ -1,7 +1,35 @@
+import numpy as np
 import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Tuple
 
+# Category order doubles as the integer code: dayofweek (Monday=0) and is-peak (Peak=1)
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PERIODS = ['Off-Peak', 'Peak']
+
+def _build_peak_table() -> np.ndarray:
+    # Period code for each of the 168 hours of the week, Monday 00:00 first:
+    # weekdays 7-10am and 4-8pm are Peak
+    week_hour = np.arange(7 * 24)
+    dow, hour = week_hour // 24, week_hour % 24
+    is_peak = (dow < 5) & (((hour >= 7) & (hour <= 10)) | ((hour >= 16) & (hour <= 20)))
+    return is_peak.astype(np.int8)
+
+PEAK_BY_WEEK_HOUR = _build_peak_table()
+
+# Fares outside (0, MAX_FARE] are refunds, voids or data errors and are left out of fare statistics
+MAX_FARE = 200
+
+# The only trip columns the tools and search index read (plus each type's pickup timestamp)
+TRIP_COLUMNS = ['PULocationID', 'DOLocationID', 'fare_amount', 'trip_distance']
+
+SOURCE_FILES = ['green_tripdata_2025-01.parquet', 'yellow_tripdata_2025-01.parquet', 'taxi_zone_lookup.csv']
+# Bump whenever the enrichment steps change so stale caches are rebuilt
+CACHE_VERSION = 7
+
 class TaxiDataLoader:
     def __init__(self, data_dir: str = 'data'):
         self.data_dir = Path(data_dir)
@@ -9,47 +37,129 @@ class TaxiDataLoader:
         self.df_yellow = None
         self.zone_lookup = None
     
-    def load_all_data(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-        self.df_green = pd.read_parquet(self.data_dir / 'green_tripdata_2025-01.parquet')
-        self.df_yellow = pd.read_parquet(self.data_dir / 'yellow_tripdata_2025-01.parquet')
-        self.zone_lookup = pd.read_csv(self.data_dir / 'taxi_zone_lookup.csv')
+    def load_all_data(self, use_cache: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        # The enriched frames are deterministic, so reload them from Arrow IPC when possible
+        from_cache = use_cache and self._cache_is_fresh()
+        
+        # pyarrow releases the GIL while reading and decoding, so the files load concurrently
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            zone_future = pool.submit(pd.read_csv, self.data_dir / 'taxi_zone_lookup.csv')
+            if from_cache:
+                green_future = pool.submit(feather.read_feather, self._cache_path('green'), memory_map=True)
+                yellow_future = pool.submit(feather.read_feather, self._cache_path('yellow'), memory_map=True)
+            else:
+                green_future = pool.submit(self._read_trips, 'green_tripdata_2025-01.parquet', 'lpep_pickup_datetime')
+                yellow_future = pool.submit(self._read_trips, 'yellow_tripdata_2025-01.parquet', 'tpep_pickup_datetime')
+            self.zone_lookup = zone_future.result()
+            self.df_green = green_future.result()
+            self.df_yellow = yellow_future.result()
         
         self._clean_zone_lookup()
+        if from_cache:
+            return self.df_green, self.df_yellow, self.zone_lookup
+        
         self._merge_zone_info()
         self._add_temporal_features()
+        self._add_fare_validity()
+        self._convert_categoricals()
+        
+        if use_cache:
+            self._write_cache()
         
         return self.df_green, self.df_yellow, self.zone_lookup
     
+    def _cache_path(self, taxi_type: str) -> Path:
+        return self.data_dir / f'enriched_{taxi_type}_v{CACHE_VERSION}.feather'
+    
+    def _cache_is_fresh(self) -> bool:
+        cache_paths = [self._cache_path('green'), self._cache_path('yellow')]
+        if not all(path.exists() for path in cache_paths):
+            return False
+        newest_source = max((self.data_dir / name).stat().st_mtime for name in SOURCE_FILES)
+        return min(path.stat().st_mtime for path in cache_paths) >= newest_source
+    
+    def _write_cache(self):
+        for taxi_type, df in [('green', self.df_green), ('yellow', self.df_yellow)]:
+            path = self._cache_path(taxi_type)
+            tmp_path = path.with_suffix('.tmp')
+            try:
+                feather.write_feather(df, tmp_path, compression='lz4')
+                tmp_path.replace(path)
+                # Enriched frames left behind by earlier CACHE_VERSIONs are never read again
+                for stale in self.data_dir.glob(f'enriched_{taxi_type}_v*.feather'):
+                    if stale != path:
+                        stale.unlink(missing_ok=True)
+            except OSError:
+                # Read-only data directory: the cache is only an optimization
+                tmp_path.unlink(missing_ok=True)
+    
+    def _read_trips(self, filename: str, datetime_col: str) -> pd.DataFrame:
+        # Column projection skips the unused column chunks entirely; self_destruct frees
+        # each Arrow column as soon as it has been converted
+        table = pq.read_table(self.data_dir / filename, columns=[datetime_col] + TRIP_COLUMNS, use_threads=True)
+        df = table.to_pandas(self_destruct=True, split_blocks=True)
+        # Dollars-and-cents and hundredths of a mile fit comfortably in float32, which halves
+        # the bytes every aggregate scans; the tools widen them and round back to 2 decimals
+        return df.astype({'fare_amount': np.float32, 'trip_distance': np.float32})
+    
     def _clean_zone_lookup(self):
         self.zone_lookup.loc[self.zone_lookup['Zone'].isnull(), 'Zone'] = 'Unknown'
         self.zone_lookup.loc[self.zone_lookup['Borough'].isnull(), 'Borough'] = 'Unknown'
     
     def _merge_zone_info(self):
-        zone_cols = self.zone_lookup[['LocationID', 'Borough', 'Zone']]
-        for df in [self.df_green, self.df_yellow]:
-            for prefix, id_col in [('PU', 'PULocationID'), ('DO', 'DOLocationID')]:
-                df_temp = df.merge(zone_cols, left_on=id_col, right_on='LocationID', how='left')
-                df[f'{prefix}_Borough'] = df_temp['Borough']
-                df[f'{prefix}_Zone'] = df_temp['Zone']
-        
         # Drop trips where pickup and dropoff locations are the same
         self.df_green = self.df_green[self.df_green['PULocationID'] != self.df_green['DOLocationID']].copy()
         self.df_yellow = self.df_yellow[self.df_yellow['PULocationID'] != self.df_yellow['DOLocationID']].copy()
+
+        # Hash lookups against the small zone table, rather than joining (and copying) the trip tables
+        borough_map = dict(zip(self.zone_lookup['LocationID'], self.zone_lookup['Borough']))
+        zone_map = dict(zip(self.zone_lookup['LocationID'], self.zone_lookup['Zone']))
+        for df in [self.df_green, self.df_yellow]:
+            for prefix, id_col in [('PU', 'PULocationID'), ('DO', 'DOLocationID')]:
+                df[f'{prefix}_Borough'] = df[id_col].map(borough_map).fillna('Unknown')
+                df[f'{prefix}_Zone'] = df[id_col].map(zone_map).fillna('Unknown')
     
     def _add_temporal_features(self):
         for df, taxi_type in [(self.df_green, 'green'), (self.df_yellow, 'yellow')]:
             datetime_col = 'lpep_pickup_datetime' if taxi_type == 'green' else 'tpep_pickup_datetime'
             
-            df['pickup_datetime'] = pd.to_datetime(df[datetime_col])
-            df['hour'] = df['pickup_datetime'].dt.hour
-            df['day_of_week'] = df['pickup_datetime'].dt.day_name()
-            df['date'] = df['pickup_datetime'].dt.date
+            # Parquet already stores a timestamp column; only parse if it arrived as text
+            pickup = df[datetime_col]
+            if not pd.api.types.is_datetime64_any_dtype(pickup):
+                pickup = pd.to_datetime(pickup, format='ISO8601', cache=True)
+            df['pickup_datetime'] = pickup
             
-            is_weekday = ~df['day_of_week'].isin(['Saturday', 'Sunday'])
-            is_peak_hour = ((df['hour'] >= 7) & (df['hour'] <= 10)) | ((df['hour'] >= 16) & (df['hour'] <= 20))
-            df['period'] = 'Off-Peak'
-            df.loc[is_weekday & is_peak_hour, 'period'] = 'Peak'
+            # Hour of day, weekday and date from whole hours since the epoch (1970-01-01 was a Thursday)
+            epoch_hours = pickup.to_numpy().astype('datetime64[h]').astype(np.int64)
+            week_hour = (epoch_hours + 3 * 24) % (7 * 24)
+            df['hour'] = (week_hour % 24).astype(np.int8)
+            # A datetime64 day column rather than one datetime.date object per row
+            df['date'] = (epoch_hours // 24).astype('datetime64[D]')
+            df['day_of_week'] = pd.Categorical.from_codes(week_hour // 24, categories=DAY_NAMES)
+            # One gather through the weekly table instead of combining four boolean masks
+            df['period'] = pd.Categorical.from_codes(PEAK_BY_WEEK_HOUR[week_hour], categories=PERIODS)
+    
+    def _add_fare_validity(self):
+        # The fare tools all restrict to plausible fares; evaluate the predicate once here
+        for df in [self.df_green, self.df_yellow]:
+            fare = df['fare_amount']
+            df['fare_valid'] = (fare > 0) & (fare <= MAX_FARE)
+    
+    def _convert_categoricals(self):
+        # A few hundred zones and a handful of boroughs: small integer codes instead of
+        # one Python string per row, and groupbys work on the codes directly.
+        # day_of_week and period are already built as categoricals in _add_temporal_features
+        for df in [self.df_green, self.df_yellow]:
+            for col in ['PU_Borough', 'DO_Borough', 'PU_Zone', 'DO_Zone']:
+                df[col] = df[col].astype('category')
+            # Both zone codes packed into one int32 so route aggregates group on a single key
+            df['route_key'] = ((df['PU_Zone'].cat.codes.to_numpy().astype(np.int32) << 16)
+                               | df['DO_Zone'].cat.codes.to_numpy().astype(np.int32))
 
 def get_df(df_green: pd.DataFrame, df_yellow: pd.DataFrame, taxi_type: str) -> pd.DataFrame:
-    dfs = {'green': df_green, 'yellow': df_yellow}
-    return dfs[taxi_type]
+    # The two types are never concatenated: 'both' is answered per type by the callers
+    if taxi_type == 'green':
+        return df_green
+    if taxi_type == 'yellow':
+        return df_yellow
+    raise ValueError(f"Unknown taxi type: {taxi_type}")
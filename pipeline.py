@@ -0,0 +1,66 @@
+import functools
+import numpy as np
+import pandas as pd
+
+# Filters understood by filtered_view; None values are skipped
+FILTER_KEYS = {
+    'fare_valid', 'min_fare', 'max_fare', 'min_distance', 'max_distance',
+    'pickup_zone', 'dropoff_zone', 'pickup_borough', 'dropoff_borough',
+    'day_of_week', 'hour', 'period'
+}
+
+def filtered_view(df: pd.DataFrame, filters: dict) -> np.ndarray:
+    # One boolean mask for all of a tool's row filters, built straight from the column arrays
+    # (each column read once) so callers aggregate arr[mask] without materializing a
+    # filtered frame. Categorical filters compare int codes rather than labels.
+    unknown = set(filters) - FILTER_KEYS
+    if unknown:
+        raise ValueError(f"Unknown filters: {sorted(unknown)}")
+
+    mask = (df['fare_valid'].to_numpy().copy() if filters.get('fare_valid')
+            else np.ones(len(df), dtype=bool))
+
+    # fare_amount/trip_distance are float32: compare bounds in the same precision, so a
+    # bound equal to a stored value includes it
+    for col, low_key, high_key in [('fare_amount', 'min_fare', 'max_fare'),
+                                   ('trip_distance', 'min_distance', 'max_distance')]:
+        low, high = filters.get(low_key), filters.get(high_key)
+        if low is None and high is None:
+            continue
+        values = df[col].to_numpy()
+        if low is not None:
+            mask &= values >= values.dtype.type(low)
+        if high is not None:
+            mask &= values <= values.dtype.type(high)
+
+    for col, key in [('PU_Zone', 'pickup_zone'), ('DO_Zone', 'dropoff_zone')]:
+        if filters.get(key):
+            mask &= _contains_mask(df[col], filters[key])
+
+    for col, key in [('PU_Borough', 'pickup_borough'), ('DO_Borough', 'dropoff_borough'),
+                     ('day_of_week', 'day_of_week'), ('period', 'period')]:
+        if filters.get(key):
+            mask &= _category_mask(df[col], filters[key])
+
+    if filters.get('hour') is not None:
+        mask &= df['hour'].to_numpy() == filters['hour']
+
+    return mask
+
+def _category_mask(series: pd.Series, value: str) -> np.ndarray:
+    # A value that isn't a category matches no rows
+    categories = series.cat.categories
+    if value not in categories:
+        return np.zeros(len(series), dtype=bool)
+    return series.cat.codes.to_numpy() == categories.get_loc(value)
+
+def _contains_mask(series: pd.Series, text: str) -> np.ndarray:
+    # Substring match against the few hundred category labels (memoized per query), then
+    # one gather through the per-code result selects the rows
+    matches = _matching_categories(tuple(series.cat.categories), text.lower())
+    return matches[series.cat.codes.to_numpy()]
+
+@functools.lru_cache(maxsize=1024)
+def _matching_categories(labels: tuple, query: str) -> np.ndarray:
+    lower_labels = np.char.lower(np.array([str(label) for label in labels], dtype=str))
+    return np.char.find(lower_labels, query) >= 0
@@ -1,12 +1,31 @@
+import functools
 import json
+import os
+import threading
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from whoosh import index
 from whoosh.fields import Schema, TEXT, NUMERIC, ID, KEYWORD
 from whoosh.qparser import MultifieldParser
-from whoosh.query import And, Term, Every
+from whoosh.query import And, Term, Every, NumericRange
 from whoosh.analysis import StemmingAnalyzer
 
+def _as_str_array(series: pd.Series) -> np.ndarray:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Stringify the few category labels once and gather them by code
+        labels = series.cat.categories.astype(str).to_numpy(dtype=object)
+        return labels[series.cat.codes.to_numpy()]
+    return series.astype(str).to_numpy(dtype=object)
+
+def _synchronized(method):
+    # Serialize access to the engine's shared searcher and index handle
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class TaxiSearchEngine:
     def __init__(self, index_dir: str = 'search_index'):
         self.index_dir = Path(index_dir)
@@ -22,23 +41,46 @@ class TaxiSearchEngine:
             dropoff_borough=KEYWORD(stored=True),
             fare_amount=NUMERIC(stored=True, numtype=float),
             trip_distance=NUMERIC(stored=True, numtype=float),
-            hour=NUMERIC(stored=True, numtype=int),
+            hour=NUMERIC(numtype=int),  # indexed for filtering, not returned
             day_of_week=KEYWORD(stored=True),
             period=KEYWORD(stored=True),  # Peak or Off-Peak
-            date=TEXT(stored=True),
+            date=TEXT(),
             # Combined text field for full-text search
             content=TEXT(analyzer=StemmingAnalyzer())
         )
         
+        # Parsers and the searcher are reused across queries; opening a searcher
+        # re-reads the segment files, which costs more than the query itself.
+        # self.parsers holds only the public search_type options
+        all_fields = ['pickup_zone', 'dropoff_zone', 'pickup_borough', 'dropoff_borough', 'content']
+        self.parsers = {
+            'zones': MultifieldParser(['pickup_zone', 'dropoff_zone'], schema=self.schema),
+            'content': MultifieldParser(['content'], schema=self.schema),
+            'all': MultifieldParser(all_fields, schema=self.schema)
+        }
+        self._filtered_parser = MultifieldParser(['pickup_zone', 'dropoff_zone', 'content'], schema=self.schema)
+        
         self.ix = None
+        self._searcher = None
+        self._index_stats = None
+        # The shared searcher is used from the MCP server's worker threads
+        self._lock = threading.RLock()
+        
+        # Agents tend to repeat the same searches; results only change when the index does
+        self._cached_search = functools.lru_cache(maxsize=256)(self._search)
+        self._cached_search_with_filters = functools.lru_cache(maxsize=256)(self._search_with_filters)
     
+    @_synchronized
     def create_index(self, df_green: pd.DataFrame, df_yellow: pd.DataFrame, force_rebuild: bool = False):
         if index.exists_in(str(self.index_dir)) and not force_rebuild:
-            self.ix = index.open_dir(str(self.index_dir))
+            self.open_index()
             return
         
+        self._close_searcher()
         self.ix = index.create_in(str(self.index_dir), self.schema)
-        writer = self.ix.writer()
+        # Stemming is CPU-bound, so spread it over worker processes. multisegment
+        # skips the final merge and leaves one segment per worker on disk.
+        writer = self.ix.writer(procs=max(1, (os.cpu_count() or 1) - 1), limitmb=512, multisegment=True)
         
         self._index_dataframe(writer, df_green, 'green')
         self._index_dataframe(writer, df_yellow, 'yellow')
@@ -46,31 +88,50 @@ class TaxiSearchEngine:
         writer.commit()
     
     def _index_dataframe(self, writer, df: pd.DataFrame, taxi_type: str):
-        df_sample = df.sample(n=min(500000, len(df)), random_state=42)
-        
-        for idx, row in df_sample.iterrows():
-            content = ' '.join(filter(None, [
-                str(row.get('PU_Zone', '')),
-                str(row.get('DO_Zone', '')),
-                str(row.get('PU_Borough', '')),
-                str(row.get('DO_Borough', '')),
-                str(row.get('day_of_week', '')),
-                str(row.get('period', ''))
-            ]))
-            
+        # Draw sample positions directly rather than permuting the whole frame, and take them in frame order
+        positions = np.random.default_rng(42).choice(len(df), size=min(500000, len(df)), replace=False, shuffle=False)
+        positions.sort()
+        df_sample = df.take(positions)
+
+        # Convert every column to Python values once, up front; iterrows() boxes every row
+        # into a Series, and per-row float()/int() on NumPy scalars is almost as slow
+        text_cols = ['PU_Zone', 'DO_Zone', 'PU_Borough', 'DO_Borough', 'day_of_week', 'period']
+        text = {col: _as_str_array(df_sample[col]) for col in text_cols}
+        # Combined search text for the whole sample in one vectorized concatenation
+        content_arr = pd.Series(text[text_cols[0]]).str.cat(
+            [pd.Series(text[col]) for col in text_cols[1:]], sep=' ', na_rep=''
+        ).to_numpy()
+
+        columns = zip(
+            df_sample.index.tolist(),
+            text['PU_Zone'],
+            text['DO_Zone'],
+            text['PU_Borough'],
+            text['DO_Borough'],
+            # Stored as float32; round the widened values back to cents / hundredths of a mile
+            np.round(df_sample['fare_amount'].to_numpy(np.float64), 2).tolist(),
+            np.round(df_sample['trip_distance'].to_numpy(np.float64), 2).tolist(),
+            df_sample['hour'].tolist(),
+            text['day_of_week'],
+            text['period'],
+            np.datetime_as_string(df_sample['date'].to_numpy(), unit='D').tolist(),
+            content_arr
+        )
+
+        for idx, pu_zone, do_zone, pu_borough, do_borough, fare, distance, hour, day, period, date, content in columns:
             writer.add_document(
                 trip_id=f"{taxi_type}_{idx}",
                 taxi_type=taxi_type,
-                pickup_zone=str(row.get('PU_Zone', 'Unknown')),
-                dropoff_zone=str(row.get('DO_Zone', 'Unknown')),
-                pickup_borough=str(row.get('PU_Borough', 'Unknown')),
-                dropoff_borough=str(row.get('DO_Borough', 'Unknown')),
-                fare_amount=float(row.get('fare_amount', 0.0)),
-                trip_distance=float(row.get('trip_distance', 0.0)),
-                hour=int(row.get('hour', 0)),
-                day_of_week=str(row.get('day_of_week', 'Unknown')),
-                period=str(row.get('period', 'Unknown')),
-                date=str(row.get('date', '')),
+                pickup_zone=pu_zone,
+                dropoff_zone=do_zone,
+                pickup_borough=pu_borough,
+                dropoff_borough=do_borough,
+                fare_amount=fare,
+                trip_distance=distance,
+                hour=hour,
+                day_of_week=day,
+                period=period,
+                date=date,
                 content=content
             )
     
@@ -84,40 +145,52 @@ class TaxiSearchEngine:
             'dropoff_borough': hit['dropoff_borough'],
             'fare_amount': hit['fare_amount'],
             'trip_distance': hit['trip_distance'],
-            'hour': hit['hour'],
             'day_of_week': hit['day_of_week'],
             'period': hit['period'],
-            'date': hit['date'],
             'score': hit.score if hasattr(hit, 'score') else 1.0
         }
     
+    @_synchronized
     def open_index(self):
         if not index.exists_in(str(self.index_dir)):
             raise ValueError(f"No index found at {self.index_dir}. Create one first.")
+        self._close_searcher()
         self.ix = index.open_dir(str(self.index_dir))
     
-    def search(self, query_string: str, limit: int = 20, search_type: str = 'all') -> dict:
-        """Search the index with query string."""
+    def _close_searcher(self):
+        # Also drops the stats and search results computed from this searcher's view of the index
+        if self._searcher is not None:
+            self._searcher.close()
+            self._searcher = None
+        self._index_stats = None
+        self._cached_search.cache_clear()
+        self._cached_search_with_filters.cache_clear()
+    
+    def _get_searcher(self):
         if self.ix is None:
             self.open_index()
+        if self._searcher is None:
+            self._searcher = self.ix.searcher()
+        return self._searcher
+    
+    def search(self, query_string: str, limit: int = 20, search_type: str = 'all') -> dict:
+        """Search the index with query string."""
+        return self._cached_search(query_string, limit, search_type)
+    
+    @_synchronized
+    def _search(self, query_string: str, limit: int, search_type: str) -> dict:
+        searcher = self._get_searcher()
+        parser = self.parsers.get(search_type, self.parsers['all'])
+        results = searcher.search(parser.parse(query_string), limit=limit)
         
-        fields = {
-            'zones': ['pickup_zone', 'dropoff_zone'],
-            'content': ['content']
-        }.get(search_type, ['pickup_zone', 'dropoff_zone', 'pickup_borough', 'dropoff_borough', 'content'])
-        
-        with self.ix.searcher() as searcher:
-            parser = MultifieldParser(fields, schema=self.schema)
-            results = searcher.search(parser.parse(query_string), limit=limit)
-            
-            hits = [self._format_hit(hit) for hit in results]
-            
-            return {
-                'query': query_string,
-                'total_results': len(results),
-                'showing': min(limit, len(results)),
-                'results': hits
-            }
+        hits = [self._format_hit(hit) for hit in results]
+        
+        return {
+            'query': query_string,
+            'total_results': len(results),
+            'showing': min(limit, len(results)),
+            'results': hits
+        }
     
     def search_with_filters(self, 
                            query_string: str = None,
@@ -130,71 +203,73 @@ class TaxiSearchEngine:
                            day_of_week: str = None,
                            limit: int = 20) -> dict:
         """Advanced search with multiple filters."""
-        if self.ix is None:
-            self.open_index()
+        return self._cached_search_with_filters(query_string, taxi_type, pickup_borough, dropoff_borough,
+                                                min_fare, max_fare, period, day_of_week, limit)
+    
+    @_synchronized
+    def _search_with_filters(self, query_string, taxi_type, pickup_borough, dropoff_borough,
+                             min_fare, max_fare, period, day_of_week, limit) -> dict:
+        searcher = self._get_searcher()
+        query_parts = []
+        
+        if query_string:
+            query_parts.append(self._filtered_parser.parse(query_string))
+        
+        for field, value in [('taxi_type', taxi_type), ('pickup_borough', pickup_borough),
+                            ('dropoff_borough', dropoff_borough), ('period', period), 
+                            ('day_of_week', day_of_week)]:
+            if value:
+                query_parts.append(Term(field, value))
+        
+        # Filter fares inside the search so the limit applies to matching trips only;
+        # as a filter (not a query clause) the range does not change relevance scores
+        fare_range = None
+        if min_fare is not None or max_fare is not None:
+            fare_range = NumericRange('fare_amount', min_fare, max_fare)
+        
+        final_query = And(query_parts) if query_parts else Every()
+        results = searcher.search(final_query, filter=fare_range, limit=limit)
+        
+        hits = [self._format_hit(hit) for hit in results]
         
-        with self.ix.searcher() as searcher:
-            query_parts = []
-            
-            if query_string:
-                parser = MultifieldParser(['pickup_zone', 'dropoff_zone', 'content'], schema=self.schema)
-                query_parts.append(parser.parse(query_string))
-            
-            for field, value in [('taxi_type', taxi_type), ('pickup_borough', pickup_borough),
-                                ('dropoff_borough', dropoff_borough), ('period', period), 
-                                ('day_of_week', day_of_week)]:
-                if value:
-                    query_parts.append(Term(field, value))
-            
-            final_query = And(query_parts) if query_parts else Every()
-            results = searcher.search(final_query, limit=limit)
-            
-            hits = [
-                self._format_hit(hit) for hit in results
-                if (min_fare is None or hit['fare_amount'] >= min_fare) and
-                   (max_fare is None or hit['fare_amount'] <= max_fare)
-            ]
-            
-            return {
-                'query': query_string or 'filtered search',
-                'filters': {
-                    'taxi_type': taxi_type,
-                    'pickup_borough': pickup_borough,
-                    'dropoff_borough': dropoff_borough,
-                    'min_fare': min_fare,
-                    'max_fare': max_fare,
-                    'period': period,
-                    'day_of_week': day_of_week
-                },
-                'total_results': len(hits),
-                'showing': min(limit, len(hits)),
-                'results': hits[:limit]
-            }
+        return {
+            'query': query_string or 'filtered search',
+            'filters': {
+                'taxi_type': taxi_type,
+                'pickup_borough': pickup_borough,
+                'dropoff_borough': dropoff_borough,
+                'min_fare': min_fare,
+                'max_fare': max_fare,
+                'period': period,
+                'day_of_week': day_of_week
+            },
+            'total_results': len(results),
+            'showing': len(hits),
+            'results': hits
+        }
     
+    @_synchronized
     def get_doc_count(self) -> int:
-        if self.ix is None:
-            self.open_index()
-        with self.ix.searcher() as searcher:
-            return searcher.doc_count_all()
+        return self._get_searcher().doc_count_all()
     
+    @_synchronized
     def get_index_stats(self) -> dict:
-        if self.ix is None:
-            self.open_index()
+        if self._index_stats is not None:
+            return self._index_stats
+        
+        searcher = self._get_searcher()
         
-        with self.ix.searcher() as searcher:
-            # Get taxi type distribution
-            taxi_types = {}
-            for taxi_type in ['green', 'yellow']:
-                query = Term('taxi_type', taxi_type)
-                results = searcher.search(query, limit=None)
-                taxi_types[taxi_type] = len(results)
-            
-            return {
-                'total_documents': searcher.doc_count_all(),
-                'index_location': str(self.index_dir),
-                'taxi_type_distribution': taxi_types,
-                'schema_fields': list(self.schema.names())
-            }
+        # Get taxi type distribution straight from the term dictionary
+        taxi_types = {taxi_type: searcher.doc_frequency('taxi_type', taxi_type)
+                      for taxi_type in ['green', 'yellow']}
+        
+        self._index_stats = {
+            'total_documents': searcher.doc_count_all(),
+            'index_location': str(self.index_dir),
+            'taxi_type_distribution': taxi_types,
+            'schema_fields': list(self.schema.names())
+        }
+        return self._index_stats
 
 
 # Convenience function for quick searches
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 from pathlib import Path
@@ -53,11 +54,17 @@ def load_data():
     global df_green, df_yellow, zone_lookup, search_engine
     loader = TaxiDataLoader(data_dir='data')
     df_green, df_yellow, zone_lookup = loader.load_all_data()
+    tools.warm_caches(df_green, df_yellow)
     search_engine = TaxiSearchEngine(index_dir='search_index')
     search_engine.create_index(df_green, df_yellow, force_rebuild=False)
+    tools.clear_caches()
+
+# Tools are async and hand their work to a worker thread: FastMCP runs sync tools on the
+# event loop, which would serialize every request behind the slowest pandas aggregation.
+# NumPy/pandas kernels and Whoosh I/O release the GIL for much of their work.
 
 @mcp.tool()
-def query_trips(
+async def query_trips(
     query_text: Optional[str] = None,
     taxi_type: TaxiType = TaxiType.BOTH,
     pickup_location: Optional[str] = None,
@@ -70,6 +77,25 @@ def query_trips(
     hour: Optional[int] = None,
     period: Optional[Period] = None,
     limit: int = 20
+) -> str:
+    return await asyncio.to_thread(
+        _query_trips, query_text, taxi_type, pickup_location, dropoff_location,
+        min_fare, max_fare, min_distance, max_distance, day_of_week, hour, period, limit
+    )
+
+def _query_trips(
+    query_text: Optional[str],
+    taxi_type: TaxiType,
+    pickup_location: Optional[str],
+    dropoff_location: Optional[str],
+    min_fare: Optional[float],
+    max_fare: Optional[float],
+    min_distance: Optional[float],
+    max_distance: Optional[float],
+    day_of_week: Optional[str],
+    hour: Optional[int],
+    period: Optional[Period],
+    limit: int
 ) -> str:
     # Deterministic routing: Use search for text-based relevance, pandas for numeric precision
     has_text_query = bool(query_text)
@@ -91,7 +117,7 @@ def query_trips(
         if dropoff_location:
             query_parts.append(dropoff_location)
         
-        return json.dumps(search_engine.search_with_filters(
+        return tools.to_json(search_engine.search_with_filters(
             query_string=' '.join(query_parts),
             taxi_type=taxi_filter,
             min_fare=min_fare,
@@ -99,7 +125,7 @@ def query_trips(
             period=period_filter,
             day_of_week=day_of_week,
             limit=limit
-        ), indent=2)
+        ))
     else:
         # PANDAS PATH: Precise filtering and statistics on full dataset
         period_filter = period.value if period else None
@@ -111,21 +137,24 @@ def query_trips(
         )
 
 @mcp.tool()
-def analyze_temporal(
+async def analyze_temporal(
     metric: TemporalMetric = TemporalMetric.BY_HOUR,
     taxi_type: TaxiType = TaxiType.BOTH,
     specific_hour: Optional[int] = None,
     specific_day: Optional[str] = None
 ) -> str:
+    return await asyncio.to_thread(_analyze_temporal, metric.value, taxi_type.value, specific_hour, specific_day)
+
+def _analyze_temporal(metric: str, taxi_type: str, specific_hour: Optional[int], specific_day: Optional[str]) -> str:
     if metric == TemporalMetric.BY_HOUR:
-        return tools.get_trip_volume_by_hour(df_green, df_yellow, taxi_type.value, specific_hour)
+        return tools.get_trip_volume_by_hour(df_green, df_yellow, taxi_type, specific_hour)
     elif metric == TemporalMetric.BY_DAY:
-        return tools.get_trip_volume_by_day(df_green, df_yellow, taxi_type.value, specific_day)
+        return tools.get_trip_volume_by_day(df_green, df_yellow, taxi_type, specific_day)
     else:
-        return tools.get_peak_vs_offpeak_stats(df_green, df_yellow, taxi_type.value)
+        return tools.get_peak_vs_offpeak_stats(df_green, df_yellow, taxi_type)
 
 @mcp.tool()
-def analyze_locations(
+async def analyze_locations(
     analysis_type: LocationAnalysis = LocationAnalysis.TOP_PICKUPS,
     taxi_type: TaxiType = TaxiType.BOTH,
     borough: Optional[str] = None,
@@ -135,21 +164,31 @@ def analyze_locations(
     top_n: int = 10
 ) -> str:
     period_value = period.value if period else None
-    
+    return await asyncio.to_thread(_analyze_locations, analysis_type.value, taxi_type.value, borough, day_of_week, hour, period_value, top_n)
+
+def _analyze_locations(
+    analysis_type: str,
+    taxi_type: str,
+    borough: Optional[str],
+    day_of_week: Optional[str],
+    hour: Optional[int],
+    period: Optional[str],
+    top_n: int
+) -> str:
     if analysis_type == LocationAnalysis.TOP_PICKUPS:
-        return tools.get_top_pickup_zones(df_green, df_yellow, taxi_type.value, top_n)
+        return tools.get_top_pickup_zones(df_green, df_yellow, taxi_type, top_n)
     elif analysis_type == LocationAnalysis.TOP_DROPOFFS:
-        return tools.get_top_dropoff_zones(df_green, df_yellow, taxi_type.value, top_n)
+        return tools.get_top_dropoff_zones(df_green, df_yellow, taxi_type, top_n)
     elif analysis_type == LocationAnalysis.BY_BOROUGH:
-        return tools.get_borough_analysis(df_green, df_yellow, taxi_type.value, borough, 'both')
+        return tools.get_borough_analysis(df_green, df_yellow, taxi_type, borough, 'both')
     else:
         return tools.get_zones_by_time(
-            df_green, df_yellow, taxi_type.value, 'pickup',
-            day_of_week, hour, period_value, top_n
+            df_green, df_yellow, taxi_type, 'pickup',
+            day_of_week, hour, period, top_n
         )
 
 @mcp.tool()
-def analyze_routes(
+async def analyze_routes(
     analysis_type: RouteAnalysis = RouteAnalysis.POPULAR,
     taxi_type: TaxiType = TaxiType.BOTH,
     min_trips: int = 10,
@@ -158,46 +197,64 @@ def analyze_routes(
     min_distance: Optional[float] = None,
     max_distance: Optional[float] = None,
     top_n: int = 10
+) -> str:
+    return await asyncio.to_thread(_analyze_routes, analysis_type.value, taxi_type.value, min_trips,
+                                   min_fare, max_fare, min_distance, max_distance, top_n)
+
+def _analyze_routes(
+    analysis_type: str,
+    taxi_type: str,
+    min_trips: int,
+    min_fare: Optional[float],
+    max_fare: Optional[float],
+    min_distance: Optional[float],
+    max_distance: Optional[float],
+    top_n: int
 ) -> str:
     if analysis_type == RouteAnalysis.POPULAR:
-        return tools.get_popular_routes(df_green, df_yellow, taxi_type.value, top_n)
+        return tools.get_popular_routes(df_green, df_yellow, taxi_type, top_n)
     else:
         return tools.get_routes_by_criteria(
-            df_green, df_yellow, taxi_type.value,
+            df_green, df_yellow, taxi_type,
             min_trips, min_fare, max_fare, min_distance, max_distance, top_n
         )
 
 @mcp.tool()
-def analyze_fares(
+async def analyze_fares(
     analysis_type: FareAnalysis = FareAnalysis.STATISTICS,
     taxi_type: TaxiType = TaxiType.BOTH,
     period: Optional[Period] = None,
     hour: Optional[int] = None
 ) -> str:
     period_value = period.value if period else None
-    
+    return await asyncio.to_thread(_analyze_fares, analysis_type.value, taxi_type.value, period_value, hour)
+
+def _analyze_fares(analysis_type: str, taxi_type: str, period: Optional[str], hour: Optional[int]) -> str:
     if analysis_type == FareAnalysis.STATISTICS:
-        return tools.get_fare_statistics(df_green, df_yellow, taxi_type.value, period_value, hour)
+        return tools.get_fare_statistics(df_green, df_yellow, taxi_type, period, hour)
     elif analysis_type == FareAnalysis.COMPARE_TYPES:
         results = {}
         for metric in ['trip_volume', 'avg_fare', 'avg_distance', 'peak_distribution']:
             comparison = json.loads(tools.compare_taxi_types(df_green, df_yellow, metric))
             results[metric] = comparison
-        return json.dumps(results, indent=2)
+        return tools.to_json(results)
     elif analysis_type == FareAnalysis.BY_HOUR:
-        return tools.get_fares_by_hour(df_green, df_yellow, taxi_type.value)
+        return tools.get_fares_by_hour(df_green, df_yellow, taxi_type)
     elif analysis_type == FareAnalysis.BY_DAY:
-        return tools.get_fares_by_day(df_green, df_yellow, taxi_type.value)
+        return tools.get_fares_by_day(df_green, df_yellow, taxi_type)
     else:  # BY_PERIOD
-        return tools.get_fares_by_period(df_green, df_yellow, taxi_type.value)
+        return tools.get_fares_by_period(df_green, df_yellow, taxi_type)
 
 @mcp.tool()
-def get_dataset_info(include_search_stats: bool = True) -> str:
+async def get_dataset_info(include_search_stats: bool = True) -> str:
+    return await asyncio.to_thread(_get_dataset_info, include_search_stats)
+
+def _get_dataset_info(include_search_stats: bool) -> str:
     summary = json.loads(tools.get_dataset_summary(df_green, df_yellow, zone_lookup))
     if include_search_stats:
         summary['search_index'] = search_engine.get_index_stats()
     
-    return json.dumps(summary, indent=2)
+    return tools.to_json(summary)
 
 if __name__ == "__main__":
     load_data()
@@ -1,11 +1,205 @@
-import json
+import functools
+import orjson
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from typing import Optional, Literal, List
-from data_loader import get_df
+from typing import Callable, Optional, Literal, List, Tuple
+from data_loader import DAY_NAMES, get_df
+from pipeline import filtered_view
 
-def _get_taxi_types(taxi_type: Literal['green', 'yellow', 'both']) -> List[str]:
-    return ['green', 'yellow'] if taxi_type == 'both' else [taxi_type]
+def to_json(obj) -> str:
+    # Compact output (MCP clients don't need indentation); orjson serializes NumPy scalars
+    # and arrays directly, and int keys (hours) as strings like json.dumps did
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
 
+# Shared immutable tuples rather than a new list on every tool call
+_TAXI_TYPES = {'green': ('green',), 'yellow': ('yellow',), 'both': ('green', 'yellow')}
+
+def _get_taxi_types(taxi_type: Literal['green', 'yellow', 'both']) -> Tuple[str, ...]:
+    # Unknown types pass through so get_df reports them
+    return _TAXI_TYPES.get(taxi_type, (taxi_type,))
+
+# Green and yellow are independent frames, and the NumPy/pandas kernels the tools use release
+# the GIL, so for 'both' the two types are computed side by side
+_POOL = ThreadPoolExecutor(max_workers=2)
+
+def _per_type(taxi_type: Literal['green', 'yellow', 'both'], compute: Callable[[str], dict]) -> dict:
+    taxi_types = _get_taxi_types(taxi_type)
+    if len(taxi_types) == 1:
+        return {taxi_types[0]: compute(taxi_types[0])}
+    return dict(zip(taxi_types, _POOL.map(compute, taxi_types)))
+
+def _as_cents(values: np.ndarray) -> np.ndarray:
+    # fare_amount and trip_distance are stored as float32 but hold cents / hundredths of a
+    # mile: widen and round back to 2 decimals so float32's representation error doesn't
+    # shift half-cent medians or sums (same as the search indexer)
+    return np.round(values.astype(np.float64), 2)
+
+def _mean(values: np.ndarray) -> float:
+    return float(_as_cents(values).mean())
+
+def _as_float64(df: pd.DataFrame) -> pd.DataFrame:
+    # pandas groupby means/medians accumulate in the input dtype; restore the float32 columns
+    # first (used for the aggregates that are computed once and cached)
+    return df.assign(**{col: _as_cents(df[col].to_numpy())
+                        for col, dtype in df.dtypes.items() if dtype == np.float32})
+
+def _zone_counts(series: pd.Series, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    # Trips per category of a zone/borough categorical (optionally only the masked rows),
+    # indexed by category code
+    codes = series.cat.codes.to_numpy()
+    if mask is not None:
+        codes = codes[mask]
+    return np.bincount(codes, minlength=len(series.cat.categories))
+
+def _ranking_key(counts: np.ndarray) -> np.ndarray:
+    # Orders categories by count (descending), then category order for ties; unique per
+    # category, so any cut through the ranking is deterministic
+    return np.arange(len(counts)) - counts.astype(np.int64) * len(counts)
+
+def _top_counts(labels: pd.Index, counts: np.ndarray, top_n: int) -> List[Tuple[str, int]]:
+    # argpartition finds the top N in linear time; only those N are then sorted.
+    # Categories with no trips are never listed.
+    top_n = min(top_n, len(counts))
+    if top_n <= 0:
+        return []
+    key = _ranking_key(counts)
+    idx = np.argpartition(key, top_n - 1)[:top_n]
+    idx = idx[np.argsort(key[idx])]
+    return [(labels[i], counts[i]) for i in idx if counts[i] > 0]
+
+def _top_zones(series: pd.Series, top_n: int, mask: Optional[np.ndarray] = None) -> List[Tuple[str, int]]:
+    return _top_counts(series.cat.categories, _zone_counts(series, mask), top_n)
+
+# Aggregates over a whole (unfiltered) frame, keyed by (id(df), aggregate). The loaded frames
+# never change, so each one is computed once; entries go away when their frame is collected.
+# Callers must treat the returned objects as read-only.
+_AGG_CACHE = {}
+_AGG_LOCK = threading.Lock()
+
+def _cached_agg(func):
+    @functools.wraps(func)
+    def wrapper(df):
+        key = (id(df), func.__name__)
+        with _AGG_LOCK:
+            if key in _AGG_CACHE:
+                return _AGG_CACHE[key]
+        result = func(df)
+        with _AGG_LOCK:
+            if key not in _AGG_CACHE:
+                _AGG_CACHE[key] = result
+                weakref.finalize(df, _AGG_CACHE.pop, key, None)
+        return _AGG_CACHE[key]
+    return wrapper
+
+# hour, day_of_week and period are small non-negative integer codes, so counting them is a
+# bincount (one pass, no hashing) rather than a groupby. Arrays are indexed by hour / code.
+@_cached_agg
+def _hourly_counts(df: pd.DataFrame) -> np.ndarray:
+    return np.bincount(df['hour'].to_numpy(), minlength=24)
+
+@_cached_agg
+def _daily_counts(df: pd.DataFrame) -> np.ndarray:
+    return np.bincount(df['day_of_week'].cat.codes.to_numpy(), minlength=len(DAY_NAMES))
+
+@_cached_agg
+def _period_stats(df: pd.DataFrame) -> pd.DataFrame:
+    return _as_float64(df[['period', 'fare_amount', 'trip_distance']]).groupby('period', observed=True).agg({
+        'fare_amount': ['size', 'mean', 'median'],
+        'trip_distance': ['mean', 'median']
+    }).round(2)
+
+@_cached_agg
+def _location_rankings(df: pd.DataFrame) -> dict:
+    # Per zone column: (trip counts, labels), most trips first, without empty categories.
+    # Top-N over a whole frame is then a slice, and the number of distinct values its length.
+    rankings = {}
+    for col in ['PU_Zone', 'DO_Zone']:
+        counts = _zone_counts(df[col])
+        order = np.argsort(_ranking_key(counts))
+        order = order[counts[order] > 0]
+        rankings[col] = (counts[order], df[col].cat.categories.to_numpy()[order])
+    return rankings
+
+@_cached_agg
+def _route_agg(df: pd.DataFrame) -> pd.DataFrame:
+    # One integer key per route instead of a two-column (pickup, dropoff) groupby;
+    # indexed by route_key, see _route_labels
+    return _as_float64(df[['route_key', 'fare_amount', 'trip_distance']]).groupby('route_key', sort=False).agg(
+        trip_count=('fare_amount', 'count'),
+        avg_fare=('fare_amount', 'mean'),
+        avg_distance=('trip_distance', 'mean')
+    ).round(2)
+
+def _top_routes(routes: pd.DataFrame, top_n: int) -> pd.DataFrame:
+    # Most trips first, ties by route key (pickup then dropoff zone order). Both fit in one
+    # unique int64, so argpartition picks the top N without sorting every route.
+    top_n = min(top_n, len(routes))
+    if top_n <= 0:
+        return routes.iloc[:0]
+    key = routes.index.to_numpy(np.int64) - routes['trip_count'].to_numpy(np.int64) * 2**32
+    idx = np.argpartition(key, top_n - 1)[:top_n]
+    return routes.iloc[idx[np.argsort(key[idx])]]
+
+def _route_labels(df: pd.DataFrame, route_keys: pd.Index) -> pd.MultiIndex:
+    keys = route_keys.to_numpy(np.int64)
+    return pd.MultiIndex.from_arrays([df['PU_Zone'].cat.categories[keys >> 16],
+                                      df['DO_Zone'].cat.categories[keys & 0xFFFF]],
+                                     names=['pickup_zone', 'dropoff_zone'])
+
+def _route_records(df: pd.DataFrame, routes: pd.DataFrame) -> List[dict]:
+    # Ranked route dicts for the JSON output, converted in one to_dict call
+    routes = routes.set_axis(_route_labels(df, routes.index)).reset_index()
+    return [{'rank': i + 1, **route} for i, route in enumerate(routes.to_dict('records'))]
+
+class _IdentityKey:
+    # Hashes and compares a frame by identity so lru_cache can key on it
+    __slots__ = ('obj',)
+    
+    def __init__(self, obj):
+        self.obj = obj
+    
+    def __hash__(self):
+        return id(self.obj)
+    
+    def __eq__(self, other):
+        return isinstance(other, _IdentityKey) and other.obj is self.obj
+
+_JSON_CACHES = []
+
+def _json_cache(func):
+    # Tool results are pure functions of the (immutable) frames and the literal arguments,
+    # and agents often repeat a call, so keep the final JSON strings
+    @functools.lru_cache(maxsize=512)
+    def cached(*args, **kwargs):
+        args = [a.obj if isinstance(a, _IdentityKey) else a for a in args]
+        kwargs = {k: v.obj if isinstance(v, _IdentityKey) else v for k, v in kwargs.items()}
+        return func(*args, **kwargs)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        args = [_IdentityKey(a) if isinstance(a, pd.DataFrame) else a for a in args]
+        kwargs = {k: _IdentityKey(v) if isinstance(v, pd.DataFrame) else v for k, v in kwargs.items()}
+        return cached(*args, **kwargs)
+    
+    _JSON_CACHES.append(cached)
+    return wrapper
+
+def clear_caches():
+    # Call when the frames are reloaded; cached results hold references to the old ones
+    for cached in _JSON_CACHES:
+        cached.cache_clear()
+
+def warm_caches(df_green: pd.DataFrame, df_yellow: pd.DataFrame):
+    # Called once after loading so the first tool calls don't pay for the full-frame scans
+    def warm(df):
+        for agg in [_hourly_counts, _daily_counts, _period_stats, _location_rankings, _route_agg]:
+            agg(df)
+    list(_POOL.map(warm, [df_green, df_yellow]))
+
+@_json_cache
 def get_trip_volume_by_hour(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -13,38 +207,39 @@ def get_trip_volume_by_hour(
     hour: Optional[int] = None
 ) -> str:
     if hour is not None and not (0 <= hour <= 23):
-        return json.dumps({'error': 'Hour must be between 0 and 23'})
+        return to_json({'error': 'Hour must be between 0 and 23'})
     
     results = {}
     for tt in _get_taxi_types(taxi_type):
-        hourly_counts = get_df(df_green, df_yellow, tt).groupby('hour').size()
-        results[tt] = ({'hour': hour, 'trip_count': int(hourly_counts.get(hour, 0))} if hour is not None
-                      else {int(h): int(c) for h, c in hourly_counts.items()})
+        hourly_counts = _hourly_counts(get_df(df_green, df_yellow, tt))
+        results[tt] = ({'hour': hour, 'trip_count': hourly_counts[hour]} if hour is not None
+                      else {h: c for h, c in enumerate(hourly_counts) if c})
     
-    return json.dumps(results, indent=2)
+    return to_json(results)
 
+@_json_cache
 def get_trip_volume_by_day(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
     taxi_type: Literal['green', 'yellow', 'both'] = 'both',
     day_of_week: Optional[str] = None
 ) -> str:
-    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     results = {}
     
     for tt in _get_taxi_types(taxi_type):
-        daily_counts = get_df(df_green, df_yellow, tt).groupby('day_of_week').size()
+        daily_counts = _daily_counts(get_df(df_green, df_yellow, tt))
         
         if day_of_week:
             day_title = day_of_week.title()
-            if day_title not in daily_counts.index:
-                return json.dumps({'error': f'Invalid day: {day_of_week}'})
-            results[tt] = {'day': day_title, 'trip_count': int(daily_counts[day_title])}
+            if day_title not in DAY_NAMES:
+                return to_json({'error': f'Invalid day: {day_of_week}'})
+            results[tt] = {'day': day_title, 'trip_count': daily_counts[DAY_NAMES.index(day_title)]}
         else:
-            results[tt] = {day: int(daily_counts.get(day, 0)) for day in day_order}
+            results[tt] = dict(zip(DAY_NAMES, daily_counts))
     
-    return json.dumps(results, indent=2)
+    return to_json(results)
 
+@_json_cache
 def get_peak_vs_offpeak_stats(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -54,30 +249,28 @@ def get_peak_vs_offpeak_stats(
     
     for tt in _get_taxi_types(taxi_type):
         df = get_df(df_green, df_yellow, tt)
-        period_stats = df.groupby('period').agg({
-            'fare_amount': ['count', 'mean', 'median'],
-            'trip_distance': ['mean', 'median']
-        }).round(2)
+        period_stats = _period_stats(df)
         
         results[tt] = {
             period: {
-                'trip_count': int(period_stats.loc[period, ('fare_amount', 'count')]),
-                'avg_fare': float(period_stats.loc[period, ('fare_amount', 'mean')]),
-                'median_fare': float(period_stats.loc[period, ('fare_amount', 'median')]),
-                'avg_distance': float(period_stats.loc[period, ('trip_distance', 'mean')]),
-                'median_distance': float(period_stats.loc[period, ('trip_distance', 'median')])
+                'trip_count': period_stats.loc[period, ('fare_amount', 'size')],
+                'avg_fare': period_stats.loc[period, ('fare_amount', 'mean')],
+                'median_fare': period_stats.loc[period, ('fare_amount', 'median')],
+                'avg_distance': period_stats.loc[period, ('trip_distance', 'mean')],
+                'median_distance': period_stats.loc[period, ('trip_distance', 'median')]
             }
             for period in ['Peak', 'Off-Peak'] if period in period_stats.index
         }
         
-        period_counts = df['period'].value_counts()
+        # The per-period trip counts are already in period_stats
         results[tt]['distribution'] = {
-            period: {'count': int(count), 'percentage': round(100 * count / len(df), 1)}
-            for period, count in period_counts.items()
+            period: {'count': count, 'percentage': round(100 * count / len(df), 1)}
+            for period, count in period_stats[('fare_amount', 'size')].items()
         }
     
-    return json.dumps(results, indent=2)
+    return to_json(results)
 
+@_json_cache
 def get_top_pickup_zones(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -88,13 +281,15 @@ def get_top_pickup_zones(
     
     for tt in _get_taxi_types(taxi_type):
         df = get_df(df_green, df_yellow, tt)
-        top_zones = df['PU_Zone'].value_counts().head(top_n)
-        results[tt] = [{'rank': i + 1, 'zone': zone, 'trip_count': int(count), 
+        counts, zones = _location_rankings(df)['PU_Zone']
+        top_zones = zip(zones[:max(top_n, 0)], counts[:max(top_n, 0)])
+        results[tt] = [{'rank': i + 1, 'zone': zone, 'trip_count': count, 
                         'percentage': round(100 * count / len(df), 2)}
-                       for i, (zone, count) in enumerate(top_zones.items())]
+                       for i, (zone, count) in enumerate(top_zones)]
     
-    return json.dumps(results, indent=2)
+    return to_json(results)
 
+@_json_cache
 def get_top_dropoff_zones(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -105,13 +300,15 @@ def get_top_dropoff_zones(
     
     for tt in _get_taxi_types(taxi_type):
         df = get_df(df_green, df_yellow, tt)
-        top_zones = df['DO_Zone'].value_counts().head(top_n)
-        results[tt] = [{'rank': i + 1, 'zone': zone, 'trip_count': int(count),
+        counts, zones = _location_rankings(df)['DO_Zone']
+        top_zones = zip(zones[:max(top_n, 0)], counts[:max(top_n, 0)])
+        results[tt] = [{'rank': i + 1, 'zone': zone, 'trip_count': count,
                         'percentage': round(100 * count / len(df), 2)}
-                       for i, (zone, count) in enumerate(top_zones.items())]
+                       for i, (zone, count) in enumerate(top_zones)]
     
-    return json.dumps(results, indent=2)
+    return to_json(results)
 
+@_json_cache
 def get_fare_statistics(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -120,60 +317,92 @@ def get_fare_statistics(
     hour: Optional[int] = None
 ) -> str:
     if hour is not None and not (0 <= hour <= 23):
-        return json.dumps({'error': 'Hour must be between 0 and 23'})
-    
-    results = {}
+        return to_json({'error': 'Hour must be between 0 and 23'})
     
-    for tt in _get_taxi_types(taxi_type):
+    def compute(tt):
         df = get_df(df_green, df_yellow, tt)
-        if period:
-            df = df[df['period'] == period]
-        if hour is not None:
-            df = df[df['hour'] == hour]
-        
-        fares = df[(df['fare_amount'] > 0) & (df['fare_amount'] <= 200)]['fare_amount']
+        mask = filtered_view(df, {'fare_valid': True, 'period': period, 'hour': hour})
+        fares = _as_cents(df['fare_amount'].to_numpy()[mask])
         
         if len(fares) == 0:
-            results[tt] = {'error': 'No data matching filters'}
-        else:
-            results[tt] = {
-                'trip_count': len(fares), 'mean': round(float(fares.mean()), 2),
-                'median': round(float(fares.median()), 2), 'std': round(float(fares.std()), 2),
-                'min': round(float(fares.min()), 2), 'max': round(float(fares.max()), 2),
-                'q25': round(float(fares.quantile(0.25)), 2), 'q75': round(float(fares.quantile(0.75)), 2)
-            }
-            if period:
-                results[tt]['filter_period'] = period
-            if hour is not None:
-                results[tt]['filter_hour'] = hour
+            return {'error': 'No data matching filters'}
+        
+        # Min and max are the 0th and 100th percentiles, so they come out of the same partition
+        fare_min, q25, median, q75, fare_max = _quantiles(fares, [0, 0.25, 0.5, 0.75, 1])
+        stats = {
+            'trip_count': len(fares), 'mean': round(_mean(fares), 2),
+            'median': round(float(median), 2), 'std': round(float(fares.std(ddof=1)), 2),
+            'min': round(float(fare_min), 2), 'max': round(float(fare_max), 2),
+            'q25': round(float(q25), 2), 'q75': round(float(q75), 2)
+        }
+        if period:
+            stats['filter_period'] = period
+        if hour is not None:
+            stats['filter_hour'] = hour
+        return stats
     
-    return json.dumps(results, indent=2)
+    return to_json(_per_type(taxi_type, compute))
+
+def _quantiles(values: np.ndarray, qs: List[float]) -> np.ndarray:
+    # Linear-interpolated quantiles (the pandas/NumPy default) from one np.partition call
+    # that places every needed order statistic, instead of a sort or select per quantile
+    if len(values) == 0:
+        return np.full(len(qs), np.nan)
+    positions = np.asarray(qs) * (len(values) - 1)
+    lo = np.floor(positions).astype(np.int64)
+    hi = np.ceil(positions).astype(np.int64)
+    part = np.partition(values, np.unique(np.concatenate([lo, hi])))
+    return part[lo] + (part[hi] - part[lo]) * (positions - lo)
+
+def _group_codes(df: pd.DataFrame, col: str) -> Tuple[np.ndarray, pd.Index]:
+    # Small non-negative integer group per row, and the label for each group
+    if col == 'hour':
+        return df['hour'].to_numpy(), pd.RangeIndex(24)
+    return df[col].cat.codes.to_numpy(), df[col].cat.categories
+
+def _grouped_stats(codes: np.ndarray, values: np.ndarray, n_groups: int) -> pd.DataFrame:
+    # Per-group mean/median/count without pandas groupby: counts and sums are weighted
+    # bincounts, and a stable sort by code (a radix sort for small ints) lays each group out
+    # contiguously for the medians. Groups with no rows are dropped, like observed=True.
+    count = np.bincount(codes, minlength=n_groups)
+    total = np.bincount(codes, weights=values, minlength=n_groups)
+    groups = np.split(values[np.argsort(codes, kind='stable')], np.cumsum(count)[:-1])
+    present = np.flatnonzero(count)
+    return pd.DataFrame({
+        'mean': total[present] / count[present],
+        'median': [np.median(groups[i]) for i in present],
+        'count': count[present]
+    }, index=present)
 
 def _aggregate_fares(df_green, df_yellow, taxi_type, groupby_col):
-    results = {}
-    for tt in _get_taxi_types(taxi_type):
+    def compute(tt):
         df = get_df(df_green, df_yellow, tt)
-        fares = df[(df['fare_amount'] > 0) & (df['fare_amount'] <= 200)]
-        agg = fares.groupby(groupby_col)['fare_amount'].agg(['mean', 'median', 'count'])
-        results[tt] = {
-            (int(k) if isinstance(k, (int, float)) else k): {
-                'avg_fare': round(float(row['mean']), 2),
-                'median_fare': round(float(row['median']), 2),
-                'trip_count': int(row['count'])
-            }
-            for k, row in agg.iterrows()
-        }
-    return json.dumps(results, indent=2)
+        fare = df['fare_amount'].to_numpy()
+        valid = df['fare_valid'].to_numpy()
+        codes, labels = _group_codes(df, groupby_col)
+        agg = _grouped_stats(codes[valid], _as_cents(fare[valid]), len(labels))
+        agg.index = labels[agg.index]
+        # Python's round() on the few group values: DataFrame.round scales by 100 first, which
+        # sends half-cent medians to the wrong side
+        for col in ['mean', 'median']:
+            agg[col] = [round(value, 2) for value in agg[col].tolist()]
+        agg = agg.rename(columns={'mean': 'avg_fare', 'median': 'median_fare', 'count': 'trip_count'})
+        return agg.to_dict('index')
+    return to_json(_per_type(taxi_type, compute))
 
+@_json_cache
 def get_fares_by_hour(df_green, df_yellow, taxi_type='both'):
     return _aggregate_fares(df_green, df_yellow, taxi_type, 'hour')
 
+@_json_cache
 def get_fares_by_day(df_green, df_yellow, taxi_type='both'):
     return _aggregate_fares(df_green, df_yellow, taxi_type, 'day_of_week')
 
+@_json_cache
 def get_fares_by_period(df_green, df_yellow, taxi_type='both'):
     return _aggregate_fares(df_green, df_yellow, taxi_type, 'period')
 
+@_json_cache
 def get_popular_routes(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -183,19 +412,12 @@ def get_popular_routes(
     results = {}
     
     for tt in _get_taxi_types(taxi_type):
-        routes = get_df(df_green, df_yellow, tt).groupby(['PU_Zone', 'DO_Zone']).agg({
-            'fare_amount': ['count', 'mean'], 'trip_distance': 'mean'
-        }).round(2)
-        routes.columns = ['trip_count', 'avg_fare', 'avg_distance']
-        routes = routes.sort_values('trip_count', ascending=False).head(top_n)
-        
-        results[tt] = [{'rank': i + 1, 'pickup_zone': pu, 'dropoff_zone': do,
-                        'trip_count': int(row['trip_count']), 'avg_fare': float(row['avg_fare']),
-                        'avg_distance': float(row['avg_distance'])}
-                       for i, ((pu, do), row) in enumerate(routes.iterrows())]
+        df = get_df(df_green, df_yellow, tt)
+        results[tt] = _route_records(df, _top_routes(_route_agg(df), top_n))
     
-    return json.dumps(results, indent=2)
+    return to_json(results)
 
+@_json_cache
 def compare_taxi_types(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -211,23 +433,24 @@ def compare_taxi_types(
         
     elif metric in ['avg_fare', 'avg_distance']:
         col = 'fare_amount' if metric == 'avg_fare' else 'trip_distance'
-        max_val = 200 if metric == 'avg_fare' else 50
-        g_data = df_green[(df_green[col] > 0) & (df_green[col] <= max_val)][col]
-        y_data = df_yellow[(df_yellow[col] > 0) & (df_yellow[col] <= max_val)][col]
-        
-        for tt, data in [('green', g_data), ('yellow', y_data)]:
-            results[tt] = {'mean': round(float(data.mean()), 2), 'median': round(float(data.median()), 2)}
+        for tt, df in [('green', df_green), ('yellow', df_yellow)]:
+            # Select the plain array once; mean is one reduction and the median one partition
+            values = df[col].to_numpy()
+            valid = df['fare_valid'].to_numpy() if metric == 'avg_fare' else (values > 0) & (values <= 50)
+            data = _as_cents(values[valid])
+            results[tt] = {'mean': round(_mean(data), 2), 'median': round(float(_quantiles(data, [0.5])[0]), 2)}
         results['comparison']['mean_difference'] = round(results['yellow']['mean'] - results['green']['mean'], 2)
         
     elif metric == 'peak_distribution':
         for tt, df in [('green', df_green), ('yellow', df_yellow)]:
-            period_pct = df['period'].value_counts(normalize=True) * 100
+            period_pct = 100 * _period_stats(df)[('fare_amount', 'size')] / max(len(df), 1)
             results[tt] = {'Peak': round(float(period_pct.get('Peak', 0)), 1),
                           'Off-Peak': round(float(period_pct.get('Off-Peak', 0)), 1)}
         results['comparison']['peak_difference'] = round(results['yellow']['Peak'] - results['green']['Peak'], 1)
     
-    return json.dumps(results, indent=2)
+    return to_json(results)
 
+@_json_cache
 def get_dataset_summary(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -236,18 +459,19 @@ def get_dataset_summary(
     def taxi_summary(df):
         return {
             'total_trips': len(df),
-            'unique_pickup_zones': int(df['PU_Zone'].nunique()),
-            'unique_dropoff_zones': int(df['DO_Zone'].nunique()),
-            'date_range': f"{df['date'].min()} to {df['date'].max()}"
+            'unique_pickup_zones': len(_location_rankings(df)['PU_Zone'][0]),
+            'unique_dropoff_zones': len(_location_rankings(df)['DO_Zone'][0]),
+            'date_range': f"{df['date'].min():%Y-%m-%d} to {df['date'].max():%Y-%m-%d}"
         }
     
-    return json.dumps({
+    return to_json({
         'data_period': 'January 2025',
         'green_taxi': taxi_summary(df_green),
         'yellow_taxi': taxi_summary(df_yellow),
         'total_zones': len(zone_lookup)
-    }, indent=2)
+    })
 
+@_json_cache
 def get_zones_by_time(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -258,54 +482,49 @@ def get_zones_by_time(
     period: Optional[Literal['Peak', 'Off-Peak']] = None,
     top_n: int = 10
 ) -> str:
-    results = {}
+    if hour is not None and not (0 <= hour <= 23):
+        return to_json({'error': 'Hour must be between 0 and 23'})
+    
     zone_col = 'PU_Zone' if zone_type == 'pickup' else 'DO_Zone'
     
-    for tt in _get_taxi_types(taxi_type):
+    def compute(tt):
         df = get_df(df_green, df_yellow, tt)
         
-        # Apply filters
-        if day_of_week:
-            day_title = day_of_week.title()
-            df = df[df['day_of_week'] == day_title]
-        
-        if hour is not None:
-            if 0 <= hour <= 23:
-                df = df[df['hour'] == hour]
-            else:
-                return json.dumps({'error': 'Hour must be between 0 and 23'})
+        mask = filtered_view(df, {
+            'day_of_week': day_of_week.title() if day_of_week else None,
+            'hour': hour,
+            'period': period
+        })
+        n_matching = int(np.count_nonzero(mask))
         
-        if period:
-            df = df[df['period'] == period]
-        
-        if len(df) == 0:
-            results[tt] = {'error': 'No trips matching the specified filters'}
-            continue
+        if n_matching == 0:
+            return {'error': 'No trips matching the specified filters'}
         
         # Get top zones
-        top_zones = df[zone_col].value_counts().head(top_n)
+        top_zones = _top_zones(df[zone_col], top_n, mask)
         
-        results[tt] = {
+        return {
             'filters': {
                 'day_of_week': day_of_week,
                 'hour': hour,
                 'period': period,
                 'zone_type': zone_type
             },
-            'total_trips_matching_filters': len(df),
+            'total_trips_matching_filters': n_matching,
             'zones': [
                 {
                     'rank': i + 1,
                     'zone': zone,
-                    'trip_count': int(count),
-                    'percentage_of_filtered': round(100 * count / len(df), 2)
+                    'trip_count': count,
+                    'percentage_of_filtered': round(100 * count / n_matching, 2)
                 }
-                for i, (zone, count) in enumerate(top_zones.items())
+                for i, (zone, count) in enumerate(top_zones)
             ]
         }
     
-    return json.dumps(results, indent=2)
+    return to_json(_per_type(taxi_type, compute))
 
+@_json_cache
 def search_trips(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -320,40 +539,28 @@ def search_trips(
     hour: Optional[int] = None,
     period: Optional[Literal['Peak', 'Off-Peak']] = None
 ) -> str:
-    results = {}
+    if hour is not None and not (0 <= hour <= 23):
+        return to_json({'error': 'Hour must be between 0 and 23'})
     
-    for tt in _get_taxi_types(taxi_type):
+    def compute(tt):
         df = get_df(df_green, df_yellow, tt)
         
-        # Apply all filters
-        if min_fare is not None:
-            df = df[df['fare_amount'] >= min_fare]
-        if max_fare is not None:
-            df = df[df['fare_amount'] <= max_fare]
-        if min_distance is not None:
-            df = df[df['trip_distance'] >= min_distance]
-        if max_distance is not None:
-            df = df[df['trip_distance'] <= max_distance]
-        if pickup_zone:
-            df = df[df['PU_Zone'].str.contains(pickup_zone, case=False, na=False)]
-        if dropoff_zone:
-            df = df[df['DO_Zone'].str.contains(dropoff_zone, case=False, na=False)]
-        if day_of_week:
-            df = df[df['day_of_week'] == day_of_week.title()]
-        if hour is not None:
-            if 0 <= hour <= 23:
-                df = df[df['hour'] == hour]
-            else:
-                return json.dumps({'error': 'Hour must be between 0 and 23'})
-        if period:
-            df = df[df['period'] == period]
+        mask = filtered_view(df, {
+            'min_fare': min_fare, 'max_fare': max_fare,
+            'min_distance': min_distance, 'max_distance': max_distance,
+            'pickup_zone': pickup_zone, 'dropoff_zone': dropoff_zone,
+            'day_of_week': day_of_week.title() if day_of_week else None,
+            'hour': hour, 'period': period
+        })
+        # Only the two numeric columns are gathered; zone counts read the codes under the mask
+        fares = _as_cents(df['fare_amount'].to_numpy()[mask])
+        distances = _as_cents(df['trip_distance'].to_numpy()[mask])
         
-        if len(df) == 0:
-            results[tt] = {'error': 'No trips matching the specified criteria'}
-            continue
+        if len(fares) == 0:
+            return {'error': 'No trips matching the specified criteria'}
         
         # Calculate statistics
-        results[tt] = {
+        return {
             'filters_applied': {
                 'min_fare': min_fare,
                 'max_fare': max_fare,
@@ -365,20 +572,21 @@ def search_trips(
                 'hour': hour,
                 'period': period
             },
-            'matching_trips': len(df),
+            'matching_trips': len(fares),
             'statistics': {
-                'avg_fare': round(float(df['fare_amount'].mean()), 2),
-                'median_fare': round(float(df['fare_amount'].median()), 2),
-                'avg_distance': round(float(df['trip_distance'].mean()), 2),
-                'median_distance': round(float(df['trip_distance'].median()), 2),
-                'total_revenue': round(float(df['fare_amount'].sum()), 2)
+                'avg_fare': round(_mean(fares), 2),
+                'median_fare': round(float(np.median(fares)), 2),
+                'avg_distance': round(_mean(distances), 2),
+                'median_distance': round(float(np.median(distances)), 2),
+                'total_revenue': round(float(fares.sum()), 2)
             },
-            'top_pickup_zones': df['PU_Zone'].value_counts().head(5).to_dict(),
-            'top_dropoff_zones': df['DO_Zone'].value_counts().head(5).to_dict()
+            'top_pickup_zones': dict(_top_zones(df['PU_Zone'], 5, mask)),
+            'top_dropoff_zones': dict(_top_zones(df['DO_Zone'], 5, mask))
         }
     
-    return json.dumps(results, indent=2)
+    return to_json(_per_type(taxi_type, compute))
 
+@_json_cache
 def get_borough_analysis(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -386,62 +594,65 @@ def get_borough_analysis(
     borough: Optional[str] = None,
     analysis_type: Literal['pickup', 'dropoff', 'both'] = 'both'
 ) -> str:
-    results = {}
-    
-    for tt in _get_taxi_types(taxi_type):
+    def compute(tt):
         df = get_df(df_green, df_yellow, tt)
         
         if borough:
             borough_title = borough.title()
             
             if analysis_type in ['pickup', 'both']:
-                pickup_df = df[df['PU_Borough'] == borough_title]
+                mask = filtered_view(df, {'pickup_borough': borough_title})
+                n_trips = int(np.count_nonzero(mask))
                 pickup_stats = {
-                    'trip_count': len(pickup_df),
-                    'avg_fare': round(float(pickup_df['fare_amount'].mean()), 2) if len(pickup_df) > 0 else 0,
-                    'avg_distance': round(float(pickup_df['trip_distance'].mean()), 2) if len(pickup_df) > 0 else 0,
-                    'top_destinations': pickup_df['DO_Zone'].value_counts().head(5).to_dict() if len(pickup_df) > 0 else {}
+                    'trip_count': n_trips,
+                    'avg_fare': round(_mean(df['fare_amount'].to_numpy()[mask]), 2) if n_trips > 0 else 0,
+                    'avg_distance': round(_mean(df['trip_distance'].to_numpy()[mask]), 2) if n_trips > 0 else 0,
+                    'top_destinations': dict(_top_zones(df['DO_Zone'], 5, mask)) if n_trips > 0 else {}
                 }
             
             if analysis_type in ['dropoff', 'both']:
-                dropoff_df = df[df['DO_Borough'] == borough_title]
+                mask = filtered_view(df, {'dropoff_borough': borough_title})
+                n_trips = int(np.count_nonzero(mask))
                 dropoff_stats = {
-                    'trip_count': len(dropoff_df),
-                    'avg_fare': round(float(dropoff_df['fare_amount'].mean()), 2) if len(dropoff_df) > 0 else 0,
-                    'avg_distance': round(float(dropoff_df['trip_distance'].mean()), 2) if len(dropoff_df) > 0 else 0,
-                    'top_origins': dropoff_df['PU_Zone'].value_counts().head(5).to_dict() if len(dropoff_df) > 0 else {}
+                    'trip_count': n_trips,
+                    'avg_fare': round(_mean(df['fare_amount'].to_numpy()[mask]), 2) if n_trips > 0 else 0,
+                    'avg_distance': round(_mean(df['trip_distance'].to_numpy()[mask]), 2) if n_trips > 0 else 0,
+                    'top_origins': dict(_top_zones(df['PU_Zone'], 5, mask)) if n_trips > 0 else {}
                 }
             
             if analysis_type == 'both':
-                results[tt] = {
+                return {
                     'borough': borough_title,
                     'pickups': pickup_stats,
                     'dropoffs': dropoff_stats
                 }
             elif analysis_type == 'pickup':
-                results[tt] = {'borough': borough_title, 'pickups': pickup_stats}
+                return {'borough': borough_title, 'pickups': pickup_stats}
             else:
-                results[tt] = {'borough': borough_title, 'dropoffs': dropoff_stats}
+                return {'borough': borough_title, 'dropoffs': dropoff_stats}
         else:
             # Summary for all boroughs
-            pickup_by_borough = df.groupby('PU_Borough').agg({
+            # Kept sorted: all_boroughs is listed in borough order
+            pickup_by_borough = _as_float64(df[['PU_Borough', 'fare_amount', 'trip_distance']]).groupby(
+                'PU_Borough', observed=True).agg({
                 'fare_amount': ['count', 'mean'],
                 'trip_distance': 'mean'
             }).round(2)
             
-            results[tt] = {
+            return {
                 'all_boroughs': {
                     borough: {
-                        'pickup_count': int(pickup_by_borough.loc[borough, ('fare_amount', 'count')]),
-                        'avg_fare': float(pickup_by_borough.loc[borough, ('fare_amount', 'mean')]),
-                        'avg_distance': float(pickup_by_borough.loc[borough, ('trip_distance', 'mean')])
+                        'pickup_count': pickup_by_borough.loc[borough, ('fare_amount', 'count')],
+                        'avg_fare': pickup_by_borough.loc[borough, ('fare_amount', 'mean')],
+                        'avg_distance': pickup_by_borough.loc[borough, ('trip_distance', 'mean')]
                     }
                     for borough in pickup_by_borough.index
                 }
             }
     
-    return json.dumps(results, indent=2)
+    return to_json(_per_type(taxi_type, compute))
 
+@_json_cache
 def get_routes_by_criteria(
     df_green: pd.DataFrame,
     df_yellow: pd.DataFrame,
@@ -458,15 +669,8 @@ def get_routes_by_criteria(
     for tt in _get_taxi_types(taxi_type):
         df = get_df(df_green, df_yellow, tt)
         
-        # Group by routes
-        routes = df.groupby(['PU_Zone', 'DO_Zone']).agg({
-            'fare_amount': ['count', 'mean'],
-            'trip_distance': 'mean'
-        }).round(2)
-        
-        routes.columns = ['trip_count', 'avg_fare', 'avg_distance']
-        
-        # Apply filters
+        # Apply filters to the (cached) per-route aggregates
+        routes = _route_agg(df)
         routes = routes[routes['trip_count'] >= min_trips]
         
         if min_fare is not None:
@@ -482,8 +686,8 @@ def get_routes_by_criteria(
             results[tt] = {'error': 'No routes matching the specified criteria'}
             continue
         
-        # Sort by trip count and get top N
-        routes = routes.sort_values('trip_count', ascending=False).head(top_n)
+        # Top N by trip count
+        routes = _top_routes(routes, top_n)
         
         results[tt] = {
             'filters_applied': {
@@ -494,17 +698,7 @@ def get_routes_by_criteria(
                 'max_distance': max_distance
             },
             'routes_found': len(routes),
-            'routes': [
-                {
-                    'rank': i + 1,
-                    'pickup_zone': pu,
-                    'dropoff_zone': do,
-                    'trip_count': int(row['trip_count']),
-                    'avg_fare': float(row['avg_fare']),
-                    'avg_distance': float(row['avg_distance'])
-                }
-                for i, ((pu, do), row) in enumerate(routes.iterrows())
-            ]
+            'routes': _route_records(df, routes)
         }
     
-    return json.dumps(results, indent=2)
+    return to_json(results)